@@ -1,27 +1,25 @@
 from asyncio import Lock
-from contextlib import asynccontextmanager
-from typing import AsyncIterator, Generic, TypeVar
+from typing import Generic, Optional, TypeVar
 
 
 T = TypeVar("T")
 
 
-class Value(Generic[T]):
-    def __init__(self, value: T) -> None:
-        self.value = value
-
-
 class MutexWrapped(Generic[T]):
-    """kind of inspired by rust/tokio mutexes"""
+    """
+    kind of inspired by rust/tokio mutexes. hold `lock` (`async with wrapped.lock:`)
+    while reading or writing `value`
+    """
 
-    def __init__(self, wrapped_object: T) -> None:
-        self._lock = Lock()
-        self._wrapped_object: Value[T] = Value(wrapped_object)
+    __slots__ = ("_lock", "value")
 
-    @asynccontextmanager
-    async def get(self) -> AsyncIterator[Value[T]]:
-        try:
-            await self._lock.acquire()
-            yield self._wrapped_object
-        finally:
-            self._lock.release()
+    def __init__(self, wrapped_object: T) -> None:
+        # plenty of these never get locked, so don't make the lock until someone asks
+        self._lock: Optional[Lock] = None
+        self.value: T = wrapped_object
+
+    @property
+    def lock(self) -> Lock:
+        if self._lock is None:
+            self._lock = Lock()
+        return self._lock
@@ -4,3 +4,10 @@ from datetime import timedelta
 DOUBLE_CLICK_WINDOW = timedelta(milliseconds=500)
 BUTTON_WATCHER_SLEEP_DURATION = timedelta(milliseconds=250)
 BUTTON_WATCHER_MAX_DURATION = timedelta(seconds=5)
+
+# the same durations as plain floats, for asyncio.sleep/loop.time() math
+DOUBLE_CLICK_WINDOW_SECONDS: float = DOUBLE_CLICK_WINDOW.total_seconds()
+BUTTON_WATCHER_SLEEP_DURATION_SECONDS: float = (
+    BUTTON_WATCHER_SLEEP_DURATION.total_seconds()
+)
+BUTTON_WATCHER_MAX_DURATION_SECONDS: float = BUTTON_WATCHER_MAX_DURATION.total_seconds()
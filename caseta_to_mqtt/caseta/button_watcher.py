@@ -1,57 +1,143 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime
+import functools
 import logging
-from typing import Any, Callable, Optional
-from caseta_to_mqtt.asynchronous.mutex_wrapper import MutexWrapped
-from caseta_to_mqtt.asynchronous.shutdown_latch import ShutdownLatchWrapper
+from typing import Any, Awaitable, Callable, Optional
 
 from caseta_to_mqtt.caseta import (
-    BUTTON_WATCHER_MAX_DURATION,
-    BUTTON_WATCHER_SLEEP_DURATION,
-    DOUBLE_CLICK_WINDOW,
+    BUTTON_WATCHER_MAX_DURATION_SECONDS,
+    BUTTON_WATCHER_SLEEP_DURATION_SECONDS,
+    DOUBLE_CLICK_WINDOW_SECONDS,
 )
 from caseta_to_mqtt.caseta.model import (
     ButtonAction,
     ButtonId,
     ButtonState,
-    IllegalStateTransitionError,
     PicoRemote,
 )
 from caseta_to_mqtt.event_handler import ButtonEvent, CasetaEvent, EventHandler
 
 LOGGER = logging.getLogger(__name__)
 
+# button watcher log lines are all prefixed with the remote and button. these are
+# %-style so that nothing gets formatted unless the log level is enabled
+_BUTTON_LOG_PREFIX = "remote: <id: %s, name: %s>, button:%s: "
+_DISPATCH_LOG_FORMAT = _BUTTON_LOG_PREFIX + "%s"
+_UNHANDLED_STATE_LOG_FORMAT = _BUTTON_LOG_PREFIX + "current state is %s"
+_TRACKING_WINDOW_ENDED_LOG_FORMAT = (
+    _BUTTON_LOG_PREFIX
+    + "the button tracking window ended without the button reaching a terminal state"
+)
+
+# (event to emit, whether the button is done being tracked, debug log message)
+_StateDispatch = tuple[ButtonEvent, bool, str]
+
+# what the button state means once the double click window has elapsed
+_DOUBLE_CLICK_WINDOW_DISPATCH: dict[ButtonState, _StateDispatch] = {
+    ButtonState.FIRST_PRESS_AND_FIRST_RELEASE: (
+        ButtonEvent.SINGLE_PRESS_COMPLETED,
+        True,
+        "a single press has completed",
+    ),
+    ButtonState.FIRST_PRESS_AWAITING_RELEASE: (
+        ButtonEvent.LONG_PRESS_ONGOING,
+        False,
+        "a long press has started but not finished",
+    ),
+    ButtonState.DOUBLE_PRESS_FINISHED: (
+        ButtonEvent.DOUBLE_PRESS_FINISHED,
+        True,
+        "a double press has completed",
+    ),
+}
+
+# what the button state means for the rest of the tracking window
+_TRACKING_WINDOW_DISPATCH: dict[ButtonState, _StateDispatch] = {
+    ButtonState.FIRST_PRESS_AND_FIRST_RELEASE: (
+        ButtonEvent.LONG_PRESS_FINISHED,
+        True,
+        "a long press has completed",
+    ),
+    ButtonState.FIRST_PRESS_AWAITING_RELEASE: (
+        ButtonEvent.LONG_PRESS_ONGOING,
+        False,
+        "a long press is still ongoing",
+    ),
+    ButtonState.DOUBLE_PRESS_FINISHED: (
+        ButtonEvent.DOUBLE_PRESS_FINISHED,
+        True,
+        "a double press has completed",
+    ),
+}
+
+# how many remote ids ButtonTracker makes room for up front. it grows past this
+_INITIAL_REMOTE_ID_SLOTS = 256
+# how many finished ButtonWatchers ButtonTracker holds onto for reuse
+_MAX_POOLED_BUTTON_WATCHERS = 64
+
 
 class ButtonHistory:
+    __slots__ = (
+        "button_state",
+        "tracking_started_at",
+        "is_finished",
+        "_state_change_waiter",
+    )
+
     def __init__(self) -> None:
-        self.button_state: MutexWrapped[ButtonState] = MutexWrapped(
-            ButtonState.NOT_PRESSED
-        )
-        self.tracking_started_at: Optional[datetime] = None
+        # only `increment` writes the button state, and it never awaits, so asyncio
+        # can't switch tasks in the middle of a transition. no lock necessary
+        self.button_state: ButtonState = ButtonState.NOT_PRESSED
+        # monotonic event loop time, not wall clock time
+        self.tracking_started_at: Optional[float] = None
         self.is_finished: bool = False
+        # resolved by the next state change. the waiter registers it before it ever
+        # yields, so a change that lands right after the wait starts isn't lost
+        self._state_change_waiter: Optional[asyncio.Future[None]] = None
 
-    async def increment(self, button_action: ButtonAction) -> None:
-        async with self.button_state.get() as button_state:
-            if not button_state.value.is_button_action_valid(button_action):
-                raise IllegalStateTransitionError(
-                    f"current button state is {button_state.value}, but received a button action of {button_action}"
-                )
-            if button_state.value == ButtonState.NOT_PRESSED:
-                self.tracking_started_at = datetime.now()
-            button_state.value = button_state.value.next_state()
+    def reset(self) -> None:
+        self.button_state = ButtonState.NOT_PRESSED
+        self.tracking_started_at = None
+        self.is_finished = False
+        self._state_change_waiter = None
+
+    def increment(self, button_action: ButtonAction) -> None:
+        next_state = self.button_state.transition(button_action)
+        if self.button_state is ButtonState.NOT_PRESSED:
+            self.tracking_started_at = asyncio.get_running_loop().time()
+        self.button_state = next_state
+
+    def notify_state_changed(self) -> None:
+        state_change_waiter = self._state_change_waiter
+        if state_change_waiter is not None and not state_change_waiter.done():
+            state_change_waiter.set_result(None)
+
+    async def wait_for_state_change(self, timeout_seconds: float) -> None:
+        state_change_waiter = asyncio.get_running_loop().create_future()
+        self._state_change_waiter = state_change_waiter
+        try:
+            # waiting on a future directly doesn't wrap it in a task that has yet to
+            # start, unlike waiting on a coroutine
+            await asyncio.wait_for(state_change_waiter, timeout=timeout_seconds)
+        except TimeoutError:
+            pass
+        finally:
+            if self._state_change_waiter is state_change_waiter:
+                self._state_change_waiter = None
 
     @property
     def is_timed_out(self) -> bool:
         return (
             self.tracking_started_at is not None
-            and (datetime.now() - self.tracking_started_at)
-            > BUTTON_WATCHER_MAX_DURATION
+            and (asyncio.get_running_loop().time() - self.tracking_started_at)
+            > BUTTON_WATCHER_MAX_DURATION_SECONDS
         )
 
 
 class ButtonWatcher:
+    __slots__ = ("_remote", "_button_id", "_handle_event", "button_history")
+
     def __init__(
         self,
         remote: PicoRemote,
@@ -60,169 +146,232 @@ class ButtonWatcher:
     ):
         self._remote: PicoRemote = remote
         self._button_id: ButtonId = button_id
-        self._event_handler: EventHandler = event_handler
+        # bind this once rather than looking it up on every dispatched event
+        self._handle_event: Callable[
+            [CasetaEvent], Awaitable[None]
+        ] = event_handler.handle_event
         self.button_history: ButtonHistory = ButtonHistory()
 
+    def reset(self, remote: PicoRemote, button_id: ButtonId) -> None:
+        """get a finished watcher ready to track a new button sequence"""
+        self._remote = remote
+        self._button_id = button_id
+        self.button_history.reset()
+
     async def button_watcher_loop(self) -> None:
         button_history = self.button_history
 
-        button_log_prefix = (
-            f"remote: <id: {self._remote.device_id}, "
-            f"name: {self._remote.name}>, "
-            f"button:{self._button_id}"
-        )
+        log_args = (self._remote.device_id, self._remote.name, self._button_id)
+        # check the log level once per button sequence rather than once per tick
+        debug_enabled = LOGGER.isEnabledFor(logging.DEBUG)
 
-        button_tracking_window_end = datetime.now() + BUTTON_WATCHER_MAX_DURATION
-        await asyncio.sleep(DOUBLE_CLICK_WINDOW.total_seconds())
-        async with button_history.button_state.get() as locked_current_state:
-            current_state = locked_current_state.value
-            if current_state == ButtonState.FIRST_PRESS_AND_FIRST_RELEASE:
-                LOGGER.debug("%s: A single press has completed", button_log_prefix)
-                button_history.is_finished = True
-                await self._event_handler.handle_event(
-                    CasetaEvent(
-                        self._remote,
-                        self._button_id,
-                        ButtonEvent.SINGLE_PRESS_COMPLETED,
-                    )
-                )
-                return
-            elif current_state == ButtonState.FIRST_PRESS_AWAITING_RELEASE:
-                LOGGER.debug(
-                    "%s: a long press has started but not finished", button_log_prefix
-                )
-                await self._event_handler.handle_event(
-                    CasetaEvent(
-                        self._remote,
-                        self._button_id,
-                        ButtonEvent.LONG_PRESS_ONGOING,
-                    )
-                )
-            elif current_state == ButtonState.DOUBLE_PRESS_FINISHED:
-                LOGGER.debug("%s: A double press has completed", button_log_prefix)
-                button_history.is_finished = True
-                await self._event_handler.handle_event(
-                    CasetaEvent(
-                        self._remote,
-                        self._button_id,
-                        ButtonEvent.DOUBLE_PRESS_FINISHED,
-                    )
+        loop = asyncio.get_running_loop()
+        button_tracking_window_end = loop.time() + BUTTON_WATCHER_MAX_DURATION_SECONDS
+        double_click_window_end = loop.time() + DOUBLE_CLICK_WINDOW_SECONDS
+        # a finished double press can't change anymore, so don't sit out the window
+        while (
+            button_history.button_state is not ButtonState.DOUBLE_PRESS_FINISHED
+            and (remaining_seconds := double_click_window_end - loop.time()) > 0
+        ):
+            await button_history.wait_for_state_change(remaining_seconds)
+        current_state = button_history.button_state
+        if await self._dispatch(
+            _DOUBLE_CLICK_WINDOW_DISPATCH, current_state, log_args, debug_enabled
+        ):
+            return
+        while (remaining_seconds := button_tracking_window_end - loop.time()) > 0:
+            # a long press has to keep ticking so that brightness keeps ramping,
+            # but every other state only changes when the button does
+            if current_state is ButtonState.FIRST_PRESS_AWAITING_RELEASE:
+                remaining_seconds = min(
+                    remaining_seconds, BUTTON_WATCHER_SLEEP_DURATION_SECONDS
                 )
+            await button_history.wait_for_state_change(remaining_seconds)
+            current_state = button_history.button_state
+            if await self._dispatch(
+                _TRACKING_WINDOW_DISPATCH, current_state, log_args, debug_enabled
+            ):
                 return
-            else:
-                LOGGER.debug(
-                    "%s: current state is %s", button_log_prefix, current_state
-                )
-        while datetime.now() < button_tracking_window_end:
-            await asyncio.sleep(BUTTON_WATCHER_SLEEP_DURATION.total_seconds())
-            async with button_history.button_state.get() as locked_current_state:
-                current_state = locked_current_state.value
-                if current_state == ButtonState.FIRST_PRESS_AND_FIRST_RELEASE:
-                    LOGGER.debug("%s: a long press has completed", button_log_prefix)
-                    button_history.is_finished = True
-                    await self._event_handler.handle_event(
-                        CasetaEvent(
-                            self._remote,
-                            self._button_id,
-                            ButtonEvent.LONG_PRESS_FINISHED,
-                        )
-                    )
-                    return
-                elif current_state == ButtonState.FIRST_PRESS_AWAITING_RELEASE:
-                    LOGGER.debug("%s: a long press is still ongoing", button_log_prefix)
-                    await self._event_handler.handle_event(
-                        CasetaEvent(
-                            self._remote,
-                            self._button_id,
-                            ButtonEvent.LONG_PRESS_ONGOING,
-                        )
-                    )
-                elif current_state == ButtonState.DOUBLE_PRESS_FINISHED:
-                    LOGGER.debug("%s: a double press has completed", button_log_prefix)
-                    button_history.is_finished = True
-                    await self._event_handler.handle_event(
-                        CasetaEvent(
-                            self._remote,
-                            self._button_id,
-                            ButtonEvent.DOUBLE_PRESS_FINISHED,
-                        )
-                    )
-                    return
-                else:
-                    LOGGER.debug(
-                        "%s: current state is %s", button_log_prefix, current_state
-                    )
         button_history.is_finished = True
-        LOGGER.debug(
-            "%s: the button tracking window ended without the button reaching a terminal state",
-            button_log_prefix,
+        if debug_enabled:
+            LOGGER.debug(_TRACKING_WINDOW_ENDED_LOG_FORMAT, *log_args)
+
+    async def _dispatch(
+        self,
+        dispatch_table: dict[ButtonState, _StateDispatch],
+        current_state: ButtonState,
+        log_args: tuple[int, str, ButtonId],
+        debug_enabled: bool,
+    ) -> bool:
+        """emits the event for `current_state`; returns True once tracking is done"""
+        dispatch = dispatch_table.get(current_state)
+        if not dispatch:
+            if debug_enabled:
+                LOGGER.debug(_UNHANDLED_STATE_LOG_FORMAT, *log_args, current_state)
+            return False
+        button_event, is_terminal, log_message = dispatch
+        if debug_enabled:
+            LOGGER.debug(_DISPATCH_LOG_FORMAT, *log_args, log_message)
+        if is_terminal:
+            self.button_history.is_finished = True
+        await self._handle_event(
+            CasetaEvent(self._remote, self._button_id, button_event)
         )
+        return is_terminal
 
-    async def increment_history(self, button_action: ButtonAction):
-        await self.button_history.increment(button_action)
+    def increment_history(self, button_action: ButtonAction):
+        self.button_history.increment(button_action)
 
 
 class ButtonTracker:
+    __slots__ = (
+        "_task_group",
+        "_button_watchers_by_remote_id",
+        "_button_watcher_pool",
+        "_caseta_event_handler",
+        "_button_event_queues_by_remote_id",
+    )
+
     def __init__(
         self,
         caseta_event_handler: EventHandler,
-        shutdown_latch_wrapper: ShutdownLatchWrapper,
+        task_group: asyncio.TaskGroup,
     ):
-        self._shutdown_latch_wrapper: ShutdownLatchWrapper = shutdown_latch_wrapper
-        self._button_watchers_by_remote_id: MutexWrapped[
-            dict[int, ButtonWatcher]
-        ] = MutexWrapped(dict())
+        # every task the tracker starts belongs to this group, so a failure in any
+        # of them cancels the rest and surfaces from main_loop
+        self._task_group: asyncio.TaskGroup = task_group
+        # asyncio is single-threaded, and we never await between reading and
+        # writing an entry, so this doesn't need a lock around it. caseta device ids
+        # are small integers, so index a list by them instead of hashing into a dict
+        self._button_watchers_by_remote_id: list[Optional[ButtonWatcher]] = [
+            None
+        ] * _INITIAL_REMOTE_ID_SLOTS
+        # finished watchers get reset and reused rather than reallocated each press
+        self._button_watcher_pool: list[ButtonWatcher] = []
         self._caseta_event_handler = caseta_event_handler
+        # each remote gets one long-lived consumer for its button events, rather
+        # than a new task per event
+        self._button_event_queues_by_remote_id: dict[
+            int, asyncio.Queue[tuple[PicoRemote, ButtonId, ButtonAction]]
+        ] = {}
 
     def button_event_callback(
         self, remote: PicoRemote, button_id: ButtonId
     ) -> Callable[[str], Any]:
-        return lambda button_event_str: asyncio.get_running_loop().create_task(
-            self._shutdown_latch_wrapper.wrap_with_shutdown_latch(
-                self._process_button_event(
-                    remote, button_id, ButtonAction.of_str(button_event_str)
+        return functools.partial(self._schedule_button_event, remote, button_id)
+
+    def _schedule_button_event(
+        self,
+        remote: PicoRemote,
+        button_id: ButtonId,
+        button_event_str: str,
+    ) -> None:
+        queue = self._button_event_queues_by_remote_id.get(remote.device_id)
+        if queue is None:
+            queue = asyncio.Queue()
+            self._button_event_queues_by_remote_id[remote.device_id] = queue
+            self._task_group.create_task(self._consume_button_events(queue))
+        queue.put_nowait((remote, button_id, ButtonAction.of_str(button_event_str)))
+
+    async def _consume_button_events(
+        self, queue: asyncio.Queue[tuple[PicoRemote, ButtonId, ButtonAction]]
+    ) -> None:
+        while True:
+            button_events = [await queue.get()]
+            # apply everything that arrived in the same burst back to back, and
+            # only wake each watcher up once the whole burst has been applied
+            while not queue.empty():
+                button_events.append(queue.get_nowait())
+            changed_button_watchers: dict[ButtonWatcher, None] = {}
+            for remote, button_id, button_action in button_events:
+                button_watcher = self._process_button_event(
+                    remote, button_id, button_action
                 )
-            )
-        )
+                if button_watcher is not None:
+                    changed_button_watchers[button_watcher] = None
+            for button_watcher in changed_button_watchers:
+                button_watcher.button_history.notify_state_changed()
 
-    async def _process_button_event(
+    def _process_button_event(
         self, remote: PicoRemote, button_id: ButtonId, button_action: ButtonAction
-    ):
-        remote_info_logging_str = f"remote: (name: {remote.name}, id: {remote.device_id}, button_id: {button_id})"
+    ) -> Optional[ButtonWatcher]:
+        """applies a button event, and returns the watcher whose state changed"""
         LOGGER.info(
-            "got a button event: %s, button_action: %s",
-            remote_info_logging_str,
+            "got a button event: remote: (name: %s, id: %s, button_id: %s), "
+            "button_action: %s",
+            remote.name,
+            remote.device_id,
+            button_id,
             button_action,
         )
 
-        async with self._button_watchers_by_remote_id.get() as button_watchers_by_remote_id:
-            button_watcher: Optional[
-                ButtonWatcher
-            ] = button_watchers_by_remote_id.value.get(remote.device_id)
+        button_watcher = self._get_button_watcher(remote.device_id)
 
-            if (
-                not button_watcher
-                or not button_watcher.button_history
-                or button_watcher.button_history.is_finished
-                or button_watcher.button_history.is_timed_out
-            ):
-                if button_action == ButtonAction.RELEASE:
-                    LOGGER.debug(
-                        "button event: %s, ButtonAction: %s, button action does not correspond "
-                        "to a button currently being tracked. ignoring it",
-                        remote_info_logging_str,
-                        button_action,
-                    )
-                    return
-                button_watcher = ButtonWatcher(
-                    remote, button_id, self._caseta_event_handler
+        if (
+            not button_watcher
+            or not button_watcher.button_history
+            or button_watcher.button_history.is_finished
+            or button_watcher.button_history.is_timed_out
+        ):
+            if button_action is ButtonAction.RELEASE:
+                LOGGER.debug(
+                    "button event: remote: (name: %s, id: %s, button_id: %s), "
+                    "ButtonAction: %s, button action does not correspond "
+                    "to a button currently being tracked. ignoring it",
+                    remote.name,
+                    remote.device_id,
+                    button_id,
+                    button_action,
                 )
-                await button_watcher.increment_history(button_action)
-                asyncio.ensure_future(
-                    self._shutdown_latch_wrapper.wrap_with_shutdown_latch(
-                        button_watcher.button_watcher_loop()
-                    )
+                return None
+            # a separate, non-Optional name, since the done callback closes over it
+            new_button_watcher = self._new_button_watcher(remote, button_id)
+            self._set_button_watcher(remote.device_id, new_button_watcher)
+            new_button_watcher.increment_history(button_action)
+            button_watcher_task = self._task_group.create_task(
+                new_button_watcher.button_watcher_loop()
+            )
+            button_watcher_task.add_done_callback(
+                functools.partial(
+                    self._recycle_button_watcher, remote.device_id, new_button_watcher
                 )
-            else:
-                await button_watcher.increment_history(button_action)
-            button_watchers_by_remote_id.value[remote.device_id] = button_watcher
+            )
+            return new_button_watcher
+        button_watcher.increment_history(button_action)
+        return button_watcher
+
+    def _get_button_watcher(self, remote_id: int) -> Optional[ButtonWatcher]:
+        if remote_id < len(self._button_watchers_by_remote_id):
+            return self._button_watchers_by_remote_id[remote_id]
+        return None
+
+    def _set_button_watcher(
+        self, remote_id: int, button_watcher: Optional[ButtonWatcher]
+    ) -> None:
+        if remote_id >= len(self._button_watchers_by_remote_id):
+            self._button_watchers_by_remote_id.extend(
+                [None] * (remote_id - len(self._button_watchers_by_remote_id) + 1)
+            )
+        self._button_watchers_by_remote_id[remote_id] = button_watcher
+
+    def _new_button_watcher(
+        self, remote: PicoRemote, button_id: ButtonId
+    ) -> ButtonWatcher:
+        if self._button_watcher_pool:
+            button_watcher = self._button_watcher_pool.pop()
+            button_watcher.reset(remote, button_id)
+            return button_watcher
+        return ButtonWatcher(remote, button_id, self._caseta_event_handler)
+
+    def _recycle_button_watcher(
+        self,
+        remote_id: int,
+        button_watcher: ButtonWatcher,
+        button_watcher_task: asyncio.Task[None],
+    ) -> None:
+        """done callback for a watcher's loop, so nothing else is using it anymore"""
+        # a newer watcher may have already replaced this one. leave that one alone
+        if self._get_button_watcher(remote_id) is button_watcher:
+            self._set_button_watcher(remote_id, None)
+        if len(self._button_watcher_pool) < _MAX_POOLED_BUTTON_WATCHERS:
+            self._button_watcher_pool.append(button_watcher)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from enum import Enum
-from typing import ClassVar
+from typing import ClassVar, Mapping, Optional
 
 
 class IllegalStateTransitionError(Exception):
@@ -10,19 +10,27 @@ class IllegalStateTransitionError(Exception):
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class PicoRemote:
     device_id: int
     name: str
-    buttons_by_button_id: dict[int, ButtonId]
+    buttons_by_button_id: Mapping[int, ButtonId]
 
+    # the generated __hash__ would try to hash the button mapping, so remotes are
+    # identified by their device id alone
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PicoRemote) and self.device_id == other.device_id
 
-@dataclass(frozen=True)
+    def __hash__(self) -> int:
+        return hash(self.device_id)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
 class PicoTwoButton(PicoRemote):
     TYPE: ClassVar[str] = "Pico2Button"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class PicoThreeButtonRaiseLower(PicoRemote):
     TYPE: ClassVar[str] = "Pico3ButtonRaiseLower"
 
@@ -40,7 +48,7 @@ class ButtonId(Enum):
 
     @classmethod
     def of_int(cls, value: int):
-        return {member.value: member for member in cls}[value]
+        return _BUTTON_IDS_BY_VALUE[value]
 
 
 class ButtonAction(Enum):
@@ -49,7 +57,15 @@ class ButtonAction(Enum):
 
     @classmethod
     def of_str(cls, value: str):
-        return {member.name: member for member in cls}[value.upper()]
+        return _BUTTON_ACTIONS_BY_NAME[value.upper()]
+
+
+_BUTTON_IDS_BY_VALUE: dict[int, ButtonId] = {
+    member.value: member for member in ButtonId
+}
+_BUTTON_ACTIONS_BY_NAME: dict[str, ButtonAction] = {
+    member.name: member for member in ButtonAction
+}
 
 
 class ButtonState(Enum):
@@ -59,28 +75,23 @@ class ButtonState(Enum):
     SECOND_PRESS_AWAITING_RELEASE = 3
     DOUBLE_PRESS_FINISHED = 4
 
-    def next_state(self):
-        if self == ButtonState.DOUBLE_PRESS_FINISHED:
+    def transition(self, button_action: ButtonAction) -> ButtonState:
+        """the state that `button_action` moves this state to"""
+        transition = _BUTTON_STATE_TRANSITIONS[self.value]
+        if transition is None or transition[0] is not button_action:
             raise IllegalStateTransitionError(
-                "there is no state after finishing a double press"
+                f"current button state is {self}, but received a button action of "
+                f"{button_action}"
             )
-        return list(ButtonState)[self.value + 1]
-
-    def is_button_action_valid(self, button_action: ButtonAction) -> bool:
-        return (self.is_awaiting_press and button_action == ButtonAction.PRESS) or (
-            self.is_awaiting_release and button_action == ButtonAction.RELEASE
-        )
-
-    @property
-    def is_awaiting_press(self):
-        return self in {
-            ButtonState.NOT_PRESSED,
-            ButtonState.FIRST_PRESS_AND_FIRST_RELEASE,
-        }
-
-    @property
-    def is_awaiting_release(self):
-        return self in {
-            ButtonState.FIRST_PRESS_AWAITING_RELEASE,
-            ButtonState.SECOND_PRESS_AWAITING_RELEASE,
-        }
+        return transition[1]
+
+
+# (the only button action each ButtonState accepts, the state that action leads
+# to), indexed by ButtonState value. a finished double press accepts nothing
+_BUTTON_STATE_TRANSITIONS: tuple[Optional[tuple[ButtonAction, ButtonState]], ...] = (
+    (ButtonAction.PRESS, ButtonState.FIRST_PRESS_AWAITING_RELEASE),
+    (ButtonAction.RELEASE, ButtonState.FIRST_PRESS_AND_FIRST_RELEASE),
+    (ButtonAction.PRESS, ButtonState.SECOND_PRESS_AWAITING_RELEASE),
+    (ButtonAction.RELEASE, ButtonState.DOUBLE_PRESS_FINISHED),
+    None,
+)
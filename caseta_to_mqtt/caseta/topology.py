@@ -1,8 +1,8 @@
 from __future__ import annotations
-import itertools
+from collections import defaultdict
 import logging
+from types import MappingProxyType
 
-from caseta_to_mqtt.asynchronous.shutdown_latch import ShutdownLatchWrapper
 from pylutron_caseta.smartbridge import Smartbridge
 
 from caseta_to_mqtt.caseta.button_watcher import ButtonTracker
@@ -15,6 +15,11 @@ from caseta_to_mqtt.caseta.model import (
 
 LOGGER = logging.getLogger(__name__)
 
+_REMOTE_CLASSES_BY_TYPE: dict[str, type[PicoRemote]] = {
+    PicoTwoButton.TYPE: PicoTwoButton,
+    PicoThreeButtonRaiseLower.TYPE: PicoThreeButtonRaiseLower,
+}
+
 
 def default_bridge(
     hostname: str, path_to_key_file: str, path_to_cert_file: str, path_to_ca_file: str
@@ -32,11 +37,9 @@ class Topology:
         self,
         caseta_bridge: Smartbridge,
         button_tracker: ButtonTracker,
-        shutdown_latch_wrapper: ShutdownLatchWrapper,
     ):
         self._caseta_bridge: Smartbridge = caseta_bridge
         self._button_tracker: ButtonTracker = button_tracker
-        self._shutdown_latch_wrapper: ShutdownLatchWrapper = shutdown_latch_wrapper
         self._is_initialized: bool = False
         self._remotes_by_id: dict[int, PicoRemote] = {}
 
@@ -50,41 +53,37 @@ class Topology:
         self._is_initialized = True
         all_buttons = self._caseta_bridge.get_buttons()
         all_devices = self._caseta_bridge.get_devices()
-        buttons_by_remote_id = {
-            remote_id: list(buttons)
-            for remote_id, buttons in itertools.groupby(
-                [button for button in all_buttons.values()],
-                lambda b: b["parent_device"],
-            )
-        }
+        # N.B. itertools.groupby would need the buttons sorted by parent device first
+        buttons_by_remote_id: defaultdict[str, list[dict]] = defaultdict(list)
+        for button in all_buttons.values():
+            buttons_by_remote_id[button["parent_device"]].append(button)
 
         for device_id, device in all_devices.items():
             # some devices are not remotes, so skip them
-            if device_id not in buttons_by_remote_id.keys():
+            if device_id not in buttons_by_remote_id:
                 continue
 
             remote_buttons = buttons_by_remote_id[device["device_id"]]
-            buttons_by_id = {
-                button["device_id"]: ButtonId.of_int(button["button_number"])
-                for button in remote_buttons
-            }
-
-            device_name = device["name"].removesuffix("_Pico")
+            buttons_by_id = MappingProxyType(
+                {
+                    button["device_id"]: ButtonId.of_int(button["button_number"])
+                    for button in remote_buttons
+                }
+            )
 
-            if device["type"] == PicoThreeButtonRaiseLower.TYPE:
-                self._remotes_by_id[device_id] = PicoThreeButtonRaiseLower(
-                    int(device_id), device_name, buttons_by_id
-                )
-            elif device["type"] == PicoTwoButton.TYPE:
-                self._remotes_by_id[device_id] = PicoTwoButton(
-                    int(device_id), device_name, buttons_by_id
-                )
-            else:
+            remote_cls = _REMOTE_CLASSES_BY_TYPE.get(device["type"])
+            if remote_cls is None:
                 LOGGER.debug(
                     "device: %s: device type `%s` is not a supported pico remote and will be skipped",
                     device["name"],
                     device["type"],
                 )
+                continue
+
+            device_name = device["name"].removesuffix("_Pico")
+            self._remotes_by_id[device_id] = remote_cls(
+                int(device_id), device_name, buttons_by_id
+            )
         LOGGER.info("done connecting to caseta bridge")
 
     @property
@@ -1,11 +1,24 @@
+import functools
+
 from dynaconf import Dynaconf
 
-settings = Dynaconf(
-    root_path="caseta_to_mqtt/",
-    envvar_prefix="DYNACONF",
-    environments=True,
-    settings_files=["settings.toml", ".secrets.toml"],
-)
 
-# `envvar_prefix` = export envvars with `export DYNACONF_FOO=bar`.
-# `settings_files` = Load these files in the order.
+@functools.cache
+def get_settings() -> Dynaconf:
+    # built on first use rather than at import time, so importing this module
+    # doesn't read or parse any settings files
+    return Dynaconf(
+        root_path="caseta_to_mqtt/",
+        # `envvar_prefix` = export envvars with `export DYNACONF_FOO=bar`.
+        envvar_prefix="DYNACONF",
+        environments=True,
+        # `settings_files` = Load these files in the order.
+        settings_files=["settings.toml", ".secrets.toml"],
+    )
+
+
+def __getattr__(name: str):
+    # keeps `from caseta_to_mqtt.config import settings` working
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
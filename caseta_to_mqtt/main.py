@@ -3,16 +3,18 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+import signal
 import ssl
 import sys
+from typing import Callable, Optional
 import aiomqtt
 from dynaconf import Dynaconf
-from caseta_to_mqtt.asynchronous.shutdown_latch import ShutdownLatchWrapper
+from pylutron_caseta.smartbridge import Smartbridge  # type: ignore[import]
 from caseta_to_mqtt.caseta import topology
 from caseta_to_mqtt.caseta.button_watcher import ButtonTracker
 
 from caseta_to_mqtt.caseta.topology import Topology
-from caseta_to_mqtt.config import settings as dynaconf_settings
+from caseta_to_mqtt.config import get_settings
 from caseta_to_mqtt.event_handler import EventHandler
 from caseta_to_mqtt.z2m.state import AllGroups, GroupStateManager
 from caseta_to_mqtt.z2m.client import Zigbee2mqttClient
@@ -26,60 +28,94 @@ logging.basicConfig(level=_LOGLEVEL, handlers=[_HANDLER])
 LOGGER = logging.getLogger(__name__)
 
 
-async def main_loop(settings: Dynaconf):
-    shutdown_latch_wrapper = ShutdownLatchWrapper()
+def _mqtt_tls_context(settings: Dynaconf) -> ssl.SSLContext:
+    # load the certificates once here, rather than handing aiomqtt paths to load
+    tls_context = ssl.create_default_context(
+        ssl.Purpose.SERVER_AUTH, cafile=settings.path_to_mqtt_ca_file
+    )
+    tls_context.load_cert_chain(
+        settings.path_to_mqtt_cert_file, settings.path_to_mqtt_key_file
+    )
+    return tls_context
+
+
+class _ShutdownRequested(Exception):
+    """raised out of the task group to cancel everything in it on shutdown"""
+
+
+async def _wait_for_shutdown(
+    shutdown_requested: asyncio.Event, smartbridge: Smartbridge
+) -> None:
+    try:
+        await shutdown_requested.wait()
+        LOGGER.info("received shutdown signal. shutting down")
+    finally:
+        # stop bridge callbacks before the task group starts cancelling, whether
+        # we're shutting down on a signal or because another task failed
+        await smartbridge.close()
+    raise _ShutdownRequested()
+
 
+async def main_loop(settings: Dynaconf):
     group_state_manager: GroupStateManager = GroupStateManager(settings)
     LOGGER.info("connecting to mqtt broker")
-    async with asyncio.TaskGroup() as task_group:
-        async with aiomqtt.Client(
-            settings.mqtt_hostname,
-            settings.mqtt_port,
-            username=settings.mqtt_username,
-            password=settings.mqtt_password,
-            tls_params=aiomqtt.TLSParameters(
-                ca_certs=settings.path_to_mqtt_ca_file,
-                certfile=settings.path_to_mqtt_cert_file,
-                keyfile=settings.path_to_mqtt_key_file,
-                cert_reqs=ssl.CERT_REQUIRED,
-                tls_version=ssl.PROTOCOL_TLS,
-            ),
-        ) as mqtt_client:
-            z2m_group_tracker = AllGroups()
-            z2m_client = Zigbee2mqttClient(
-                mqtt_client,
-                group_state_manager,
-                z2m_group_tracker,
-                shutdown_latch_wrapper,
-            )
-            caseta_event_handler: EventHandler = EventHandler(
-                z2m_client, z2m_group_tracker, group_state_manager, settings
-            )
-            button_tracker = ButtonTracker(caseta_event_handler, shutdown_latch_wrapper)
-
-            smartbridge = topology.default_bridge(
-                settings.caseta_bridge_hostname,
-                settings.path_to_lutron_client_key,
-                settings.path_to_lutron_client_cert,
-                settings.path_to_lutron_ca_cert,
-            )
-            caseta_topology = Topology(
-                smartbridge, button_tracker, shutdown_latch_wrapper
-            )
-            LOGGER.info("connecting to caseta bridge")
-            await caseta_topology.connect()
-            caseta_topology.load_callbacks()
-            LOGGER.info("done connecting to caseta bridge")
-            task_group.create_task(
-                shutdown_latch_wrapper.wrap_with_shutdown_latch(
-                    z2m_client.subscribe_to_zigbee2mqtt_messages()
+    async with aiomqtt.Client(
+        settings.mqtt_hostname,
+        settings.mqtt_port,
+        username=settings.mqtt_username,
+        password=settings.mqtt_password,
+        tls_context=_mqtt_tls_context(settings),
+    ) as mqtt_client:
+        z2m_group_tracker = AllGroups()
+        z2m_client = Zigbee2mqttClient(
+            mqtt_client, group_state_manager, z2m_group_tracker
+        )
+        caseta_event_handler: EventHandler = EventHandler(
+            z2m_client, z2m_group_tracker, group_state_manager, settings
+        )
+        smartbridge = topology.default_bridge(
+            settings.caseta_bridge_hostname,
+            settings.path_to_lutron_client_key,
+            settings.path_to_lutron_client_cert,
+            settings.path_to_lutron_ca_cert,
+        )
+        shutdown_requested = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, shutdown_requested.set)
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                button_tracker = ButtonTracker(caseta_event_handler, task_group)
+                caseta_topology = Topology(smartbridge, button_tracker)
+                LOGGER.info("connecting to caseta bridge")
+                await caseta_topology.connect()
+                caseta_topology.load_callbacks()
+                LOGGER.info("done connecting to caseta bridge")
+                task_group.create_task(z2m_client.subscribe_to_zigbee2mqtt_messages())
+                task_group.create_task(z2m_client.publish_pending_messages())
+                LOGGER.info("done connecting to mqtt broker")
+                task_group.create_task(
+                    _wait_for_shutdown(shutdown_requested, smartbridge)
+                )
+        except* _ShutdownRequested:
+            pass
+        except* Exception as failures:
+            for e in failures.exceptions:
+                LOGGER.error(
+                    "encountered an exception: %s. shutting down", e, exc_info=e
                 )
-            )
-            LOGGER.info("done connecting to mqtt broker")
-            await shutdown_latch_wrapper.wait()
-            LOGGER.info("received shutdown signal. shutting down")
-            await smartbridge.close()
+            raise
+
+
+def _event_loop_factory() -> Optional[Callable[[], asyncio.AbstractEventLoop]]:
+    # uvloop is optional. use it if it's installed, and stock asyncio otherwise
+    try:
+        import uvloop  # type: ignore[import]
+    except ImportError:
+        return None
+    return uvloop.new_event_loop
 
 
 if __name__ == "__main__":
-    asyncio.run(main_loop(dynaconf_settings))
+    with asyncio.Runner(loop_factory=_event_loop_factory()) as runner:
+        runner.run(main_loop(get_settings()))
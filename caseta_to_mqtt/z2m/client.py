@@ -1,10 +1,9 @@
-from datetime import datetime
+import asyncio
 import json
 import logging
 from typing import Optional
 import aiomqtt
 
-from caseta_to_mqtt.asynchronous.shutdown_latch import ShutdownLatchWrapper
 from caseta_to_mqtt.z2m.model import (
     Brightness,
     GroupState,
@@ -16,62 +15,85 @@ from caseta_to_mqtt.z2m.state import AllGroups, GroupStateManager
 
 LOGGER = logging.getLogger(__name__)
 
+_BRIDGE_GROUPS_TOPIC = "zigbee2mqtt/bridge/groups"
+# how long a queued command waits for newer commands that would replace it
+_PUBLISH_COALESCING_WINDOW_SECONDS = 0.01
+
+# (id, friendly name, ((scene id, scene name), ...)) for a group in a bridge message
+_GroupSignature = tuple[int, str, tuple[tuple[int, str], ...]]
+
+
+def _deserializable_payload(message: aiomqtt.Message) -> str | bytearray | bytes:
+    payload = message.payload
+    # aiomqtt hands over bytes for everything we subscribe to, so check for that
+    # exact type before falling back to the other types json can read
+    if type(payload) is not bytes and not isinstance(payload, (str, bytearray)):
+        raise AssertionError(f"expected deserializable json, but got {type(payload)}")
+    return payload
+
 
 class Zigbee2mqttClient:
-    _GET_STATE_MESSAGE_BODY: str = json.dumps({"state": {}})
-    _TURN_ON_MESSAGE_BODY: str = json.dumps({"state": OnOrOff.ON.as_str()})
-    _TURN_OFF_MESSAGE_BODY: str = json.dumps({"state": OnOrOff.OFF.as_str()})
+    # these never change, so publish them as ready-made bytes
+    _GET_STATE_MESSAGE_BODY: bytes = b'{"state": {}}'
+    _GET_GROUP_STATE_MESSAGE_BODY: bytes = b'{"state": ""}'
+    _TURN_ON_MESSAGE_BODY: bytes = b'{"state": "on"}'
+    _TURN_OFF_MESSAGE_BODY: bytes = b'{"state": "off"}'
 
     def __init__(
         self,
         mqtt_client: aiomqtt.Client,
         group_state_manager: GroupStateManager,
         all_groups: AllGroups,
-        shutdown_latch_wrapper: ShutdownLatchWrapper,
     ):
         self._mqtt_client: aiomqtt.Client = mqtt_client
         self._group_state_manager = group_state_manager
-        self._shutdown_latch_wrapper: ShutdownLatchWrapper = shutdown_latch_wrapper
         self._all_groups: AllGroups = all_groups
+        # queued commands, keyed by (topic, kind of command). a newer command of the
+        # same kind for the same topic replaces the older one
+        self._pending_publishes: dict[tuple[str, str], str | bytes] = {}
+        self._pending_publishes_added: asyncio.Event = asyncio.Event()
+        # zigbee2mqtt resends every group whenever any group changes, so only
+        # subscribe to the ones we haven't seen before
+        self._subscribed_group_topics: set[str] = set()
+        # the groups from the last bridge message, so that resending an unchanged
+        # group reuses it instead of building its scenes and group all over again
+        self._groups_by_signature: dict[_GroupSignature, Zigbee2mqttGroup] = {}
 
     async def subscribe_to_zigbee2mqtt_messages(self) -> None:
         async with self._mqtt_client.messages() as messages:
             # listen for new groups
-            await self._mqtt_client.subscribe("zigbee2mqtt/bridge/groups")
+            await self._mqtt_client.subscribe(_BRIDGE_GROUPS_TOPIC)
             async for message in messages:
-                if message.topic.matches("zigbee2mqtt/bridge/groups"):
+                # none of the topics we subscribe to have wildcards, so compare
+                # them exactly instead of running topic matching against each one
+                topic = message.topic.value
+                if topic == _BRIDGE_GROUPS_TOPIC:
                     await self._handle_groups_response(message)
+                    continue
 
-                else:
-                    current_groups = await self._all_groups.get_groups()
-                    if any(
-                        message.topic.matches(group.topic) for group in current_groups
-                    ):
-                        await self._handle_single_group_response(message)
+                z2m_group = (await self._all_groups.get_groups_by_topic()).get(topic)
+                if z2m_group is not None:
+                    await self._handle_single_group_response(message, z2m_group)
 
-    async def _handle_single_group_response(self, message: aiomqtt.Message):
+    async def _handle_single_group_response(
+        self, message: aiomqtt.Message, z2m_group: Zigbee2mqttGroup
+    ):
         LOGGER.debug("got message for topic: %s", message.topic)
 
-        payload: str | bytearray | bytes
-        if isinstance(message.payload, (str, bytearray, bytes)):
-            payload = message.payload
-        else:
-            raise AssertionError(
-                f"expected deserializable json, but got {type(message.payload)}"
-            )
-        deserialized_group_response = json.loads(payload) if message.payload else {}
-        group_name = Zigbee2mqttGroup.friendly_name_from_topic_name(message.topic.value)
+        payload = _deserializable_payload(message)
+        deserialized_group_response = json.loads(payload) if payload else {}
 
-        now = datetime.now()
+        now = asyncio.get_running_loop().time()
+        brightness_value = deserialized_group_response.get("brightness")
         brightness_maybe: Optional[Brightness] = (
-            Brightness(int(deserialized_group_response["brightness"]))
-            if "brightness" in deserialized_group_response
+            Brightness.of(int(brightness_value))
+            if brightness_value is not None
             else None
         )
         on_or_off_state = OnOrOff.from_str(deserialized_group_response.get("state"))
 
-        await self._group_state_manager.update_group_state(
-            group_name,
+        self._group_state_manager.update_group_state(
+            z2m_group.friendly_name,
             GroupState(
                 brightness=brightness_maybe,
                 state=on_or_off_state,
@@ -82,52 +104,93 @@ class Zigbee2mqttClient:
         LOGGER.debug("done handling message for topic %s", message.topic)
 
     async def _handle_groups_response(self, message: aiomqtt.Message):
-        payload: str | bytearray | bytes
-        if isinstance(message.payload, (str, bytearray, bytes)):
-            payload = message.payload
-        else:
-            raise AssertionError(
-                f"expected deserializable json, but got {type(message.payload)}"
-            )
-        groups_response = json.loads(payload)  # if message.payload else []
+        payload = _deserializable_payload(message)
+        groups_response = json.loads(payload) if payload else []
         LOGGER.debug("got message for topic: %s", message.topic)
         all_groups: set[Zigbee2mqttGroup] = set()
+        get_state_messages: list[tuple[str, str | bytes]] = []
+        new_group_topics: list[str] = []
+        groups_by_signature: dict[_GroupSignature, Zigbee2mqttGroup] = {}
         for group in groups_response:
-            scenes = [
-                Zigbee2mqttScene(scene["id"], scene["name"])
-                for scene in group["scenes"]
-            ]
-            new_group = Zigbee2mqttGroup(group["id"], group["friendly_name"], scenes)
+            signature: _GroupSignature = (
+                group["id"],
+                group["friendly_name"],
+                tuple((scene["id"], scene["name"]) for scene in group["scenes"]),
+            )
+            new_group = self._groups_by_signature.get(signature)
+            if new_group is None:
+                new_group = Zigbee2mqttGroup(
+                    signature[0],
+                    signature[1],
+                    tuple(Zigbee2mqttScene(*scene) for scene in signature[2]),
+                )
+            groups_by_signature[signature] = new_group
             all_groups.add(new_group)
-            await self._mqtt_client.subscribe(new_group.topic)
-            await self._mqtt_client.publish(
-                f"{new_group.topic}/get", json.dumps({"state": ""})
+            if new_group.topic not in self._subscribed_group_topics:
+                new_group_topics.append(new_group.topic)
+            get_state_messages.append(
+                (new_group.get_topic, Zigbee2mqttClient._GET_GROUP_STATE_MESSAGE_BODY)
             )
+        if new_group_topics:
+            # one SUBSCRIBE packet for all of the new topics
+            await self._mqtt_client.subscribe(
+                [(topic, 0) for topic in new_group_topics]
+            )
+            self._subscribed_group_topics.update(new_group_topics)
+        await self.publish_batch(get_state_messages)
+        self._groups_by_signature = groups_by_signature
 
         await self._all_groups.update_groups(all_groups)
 
+    async def publish_batch(self, messages: list[tuple[str, str | bytes]]):
+        """publish (topic, payload) pairs without waiting on each one in turn"""
+        await asyncio.gather(
+            *(
+                self._mqtt_client.publish(topic, payload=payload)
+                for topic, payload in messages
+            )
+        )
+
+    async def publish_pending_messages(self) -> None:
+        """publish queued commands in batches, for as long as the client is running"""
+        while True:
+            await self._pending_publishes_added.wait()
+            await asyncio.sleep(_PUBLISH_COALESCING_WINDOW_SECONDS)
+            self._pending_publishes_added.clear()
+            pending_publishes, self._pending_publishes = self._pending_publishes, {}
+            await self.publish_batch(
+                [(topic, payload) for (topic, _), payload in pending_publishes.items()]
+            )
+
+    def _enqueue_publish(self, topic: str, command: str, payload: str | bytes):
+        key = (topic, command)
+        # move replaced commands to the back, so commands still go out in the order
+        # that their latest versions were queued
+        self._pending_publishes.pop(key, None)
+        self._pending_publishes[key] = payload
+        self._pending_publishes_added.set()
+
     async def turn_on_group(self, group: Zigbee2mqttGroup):
-        await self._mqtt_client.publish(
-            f"{group.topic}/set", Zigbee2mqttClient._TURN_ON_MESSAGE_BODY
+        self._enqueue_publish(
+            group.set_topic, "state", Zigbee2mqttClient._TURN_ON_MESSAGE_BODY
         )
 
     async def turn_off_group(self, group: Zigbee2mqttGroup):
-        await self._mqtt_client.publish(
-            f"{group.topic}/set", Zigbee2mqttClient._TURN_OFF_MESSAGE_BODY
+        self._enqueue_publish(
+            group.set_topic, "state", Zigbee2mqttClient._TURN_OFF_MESSAGE_BODY
         )
 
     async def publish_get_loop_state_message(self, group: Zigbee2mqttGroup):
         await self._mqtt_client.publish(
-            f"{group.topic}/get", Zigbee2mqttClient._GET_STATE_MESSAGE_BODY
+            group.get_topic, Zigbee2mqttClient._GET_STATE_MESSAGE_BODY
         )
 
     async def recall_scene(self, group: Zigbee2mqttGroup, scene: Zigbee2mqttScene):
-        scene_recall_payload = json.dumps({"scene_recall": scene.id})
-        await self._mqtt_client.publish(
-            f"{group.topic}/set", payload=scene_recall_payload
+        self._enqueue_publish(
+            group.set_topic, "scene_recall", scene.recall_message_body
         )
 
     async def set_brightness(self, group: Zigbee2mqttGroup, brightness: Brightness):
-        await self._mqtt_client.publish(
-            f"{group.topic}/set", payload=json.dumps(brightness.as_z2m_message())
+        self._enqueue_publish(
+            group.set_topic, "brightness", brightness.as_z2m_message_body()
         )
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime
+import json
+from dataclasses import dataclass, field
 from enum import StrEnum
 from typing import Optional
 
@@ -10,31 +10,44 @@ from typing import Optional
 class Zigbee2mqttScene:
     id: int
     friendly_name: str
+    # encoded once, since scenes never change
+    recall_message_body: bytes = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(
+            self, "recall_message_body", json.dumps({"scene_recall": self.id}).encode()
+        )
 
 
 @dataclass(frozen=True)
 class Zigbee2mqttGroup:
     id: int
     friendly_name: str
-    scenes: list[Zigbee2mqttScene]
-
-    @property
-    def topic(self) -> str:
-        return f"zigbee2mqtt/{self.friendly_name}"
-
-    @staticmethod
-    def friendly_name_from_topic_name(topic_name: str):
-        return topic_name.removeprefix("zigbee2mqtt/")
-
-    def __key(self) -> tuple:
-        return (
-            self.id,
-            self.friendly_name,
-            tuple(f"{scene.id}-{scene.friendly_name}" for scene in self.scenes),
+    scenes: tuple[Zigbee2mqttScene, ...]
+    # where each scene id sits in `scenes`
+    scene_index_by_id: dict[int, int] = field(init=False, repr=False, compare=False)
+    # built once, since they get read on every publish and every incoming message
+    topic: str = field(init=False, repr=False, compare=False)
+    set_topic: str = field(init=False, repr=False, compare=False)
+    get_topic: str = field(init=False, repr=False, compare=False)
+    # groups are frozen, so hash them once rather than on every set/dict lookup
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(
+            self,
+            "scene_index_by_id",
+            {scene.id: index for index, scene in enumerate(self.scenes)},
+        )
+        object.__setattr__(self, "topic", f"zigbee2mqtt/{self.friendly_name}")
+        object.__setattr__(self, "set_topic", f"{self.topic}/set")
+        object.__setattr__(self, "get_topic", f"{self.topic}/get")
+        object.__setattr__(
+            self, "_hash", hash((self.id, self.friendly_name, self.scenes))
         )
 
-    def __hash__(self) -> int:
-        return hash(self.__key())
+    def __hash__(self):
+        return self._hash
 
 
 class OnOrOff(StrEnum):
@@ -46,10 +59,25 @@ class OnOrOff(StrEnum):
 
     @classmethod
     def from_str(cls, str_literal) -> OnOrOff:
-        return cls[str_literal.upper()]
+        on_or_off = _ON_OR_OFF_BY_STR.get(str_literal)
+        if on_or_off is None:
+            return cls[str_literal.upper()]
+        return on_or_off
+
+
+# zigbee2mqtt reports state as "ON"/"OFF", so look the usual spellings up directly
+# instead of upper-casing and going through the enum on every message
+_ON_OR_OFF_BY_STR: dict[str, OnOrOff] = {
+    spelling: member
+    for member in OnOrOff
+    for spelling in (member.value, member.value.upper(), member.value.capitalize())
+}
 
 
 class Brightness:
+    # every value is built once at import and shared, so keep them small
+    __slots__ = ("_value", "_z2m_message_body")
+
     MINIMUM: Brightness
     MAXIMUM: Brightness
     _MINIMUM_VALUE: int = 1
@@ -64,30 +92,88 @@ class Brightness:
         ):
             raise AssertionError(f"{value} is not a valid brightness value")
         self._value = value
+        self._z2m_message_body: bytes = json.dumps(self.as_z2m_message()).encode()
+
+    @classmethod
+    def of(cls, value: int) -> Brightness:
+        """the shared instance for a brightness value"""
+        try:
+            return _BRIGHTNESS_BY_VALUE[value]
+        except KeyError:
+            raise AssertionError(f"{value} is not a valid brightness value") from None
 
     def next_higher_value(self) -> Brightness:
-        next_higher_value: int = min(
-            self._value + Brightness._STEP_SIZE, Brightness._MAXIMUM_VALUE
-        )
-        return Brightness(next_higher_value)
+        return _NEXT_HIGHER_BRIGHTNESS_BY_VALUE[self._value]
 
     def next_lower_value(self) -> Brightness:
-        next_lower_value: int = max(
-            self._value - Brightness._STEP_SIZE, Brightness._MINIMUM_VALUE
-        )
-        return Brightness(next_lower_value)
+        return _NEXT_LOWER_BRIGHTNESS_BY_VALUE[self._value]
 
     def as_z2m_message(self) -> dict[str, int]:
         return {"brightness": self._value}
 
-
-Brightness.MINIMUM = Brightness(Brightness._MINIMUM_VALUE)
-Brightness.MAXIMUM = Brightness(Brightness._MAXIMUM_VALUE)
-
-
-@dataclass(frozen=True, kw_only=True)
+    def as_z2m_message_body(self) -> bytes:
+        return self._z2m_message_body
+
+
+# there are only 254 brightness values, so work out every step up and down once
+# instead of on every button press. both are indexed by brightness value
+_BRIGHTNESS_BY_VALUE: dict[int, Brightness] = {
+    value: Brightness(value)
+    for value in range(Brightness._MINIMUM_VALUE, Brightness._MAXIMUM_VALUE + 1)
+}
+_NEXT_HIGHER_BRIGHTNESS_BY_VALUE: dict[int, Brightness] = {
+    value: _BRIGHTNESS_BY_VALUE[
+        min(value + Brightness._STEP_SIZE, Brightness._MAXIMUM_VALUE)
+    ]
+    for value in _BRIGHTNESS_BY_VALUE
+}
+_NEXT_LOWER_BRIGHTNESS_BY_VALUE: dict[int, Brightness] = {
+    value: _BRIGHTNESS_BY_VALUE[
+        max(value - Brightness._STEP_SIZE, Brightness._MINIMUM_VALUE)
+    ]
+    for value in _BRIGHTNESS_BY_VALUE
+}
+
+Brightness.MINIMUM = _BRIGHTNESS_BY_VALUE[Brightness._MINIMUM_VALUE]
+Brightness.MAXIMUM = _BRIGHTNESS_BY_VALUE[Brightness._MAXIMUM_VALUE]
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
 class GroupState:
     brightness: Optional[Brightness]
     state: OnOrOff
     scene: Optional[Zigbee2mqttScene]
-    updated_at: datetime
+    # monotonic event loop time, not wall clock time
+    updated_at: float
+
+    @classmethod
+    def merged(
+        cls,
+        current: Optional[GroupState],
+        incoming: GroupState,
+        now: float,
+        scene_ttl_seconds: float,
+    ) -> GroupState:
+        """`incoming` layered over `current`. fields `incoming` leaves as None keep
+        their current values, except for scenes older than `scene_ttl_seconds`"""
+        if current is None:
+            return cls(
+                brightness=incoming.brightness,
+                state=incoming.state,
+                scene=incoming.scene,
+                updated_at=now,
+            )
+        scene = incoming.scene
+        # don't carry a scene over once it's too old to trust
+        if scene is None and now - current.updated_at <= scene_ttl_seconds:
+            scene = current.scene
+        return cls(
+            brightness=(
+                incoming.brightness
+                if incoming.brightness is not None
+                else current.brightness
+            ),
+            state=incoming.state,
+            scene=scene,
+            updated_at=now,
+        )
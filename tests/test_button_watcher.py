@@ -0,0 +1,54 @@
+import asyncio
+import unittest
+from typing import cast
+
+from caseta_to_mqtt.caseta.button_watcher import ButtonHistory, ButtonTracker
+from caseta_to_mqtt.caseta.model import ButtonId, PicoThreeButtonRaiseLower
+from caseta_to_mqtt.event_handler import EventHandler
+
+
+class FailingEventHandler:
+    async def handle_event(self, event):
+        raise RuntimeError("boom")
+
+
+class ButtonHistoryTest(unittest.IsolatedAsyncioTestCase):
+    async def test_notify_right_after_the_wait_starts_wakes_the_waiter(self):
+        button_history = ButtonHistory()
+        waiter = asyncio.create_task(button_history.wait_for_state_change(5))
+        # let the waiter start waiting, but nothing else
+        await asyncio.sleep(0)
+
+        button_history.notify_state_changed()
+
+        await asyncio.wait_for(waiter, timeout=1)
+
+    async def test_wait_gives_up_after_the_timeout(self):
+        button_history = ButtonHistory()
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+
+        await button_history.wait_for_state_change(0.01)
+
+        self.assertGreaterEqual(loop.time() - started_at, 0.01)
+
+
+class ButtonTrackerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_a_failing_button_watcher_cancels_the_task_group(self):
+        remote = PicoThreeButtonRaiseLower(1, "kitchen", {})
+
+        with self.assertRaises(ExceptionGroup) as raised:
+            async with asyncio.TaskGroup() as task_group:
+                sibling = task_group.create_task(asyncio.sleep(5))
+                button_tracker = ButtonTracker(
+                    cast(EventHandler, FailingEventHandler()), task_group
+                )
+                callback = button_tracker.button_event_callback(
+                    remote, ButtonId.POWER_ON
+                )
+                callback("Press")
+                await asyncio.sleep(0.05)
+                callback("Release")
+
+        self.assertTrue(sibling.cancelled())
+        self.assertIsNotNone(raised.exception.subgroup(RuntimeError))
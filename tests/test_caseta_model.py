@@ -0,0 +1,53 @@
+import unittest
+from types import MappingProxyType
+
+from caseta_to_mqtt.caseta.model import (
+    ButtonAction,
+    ButtonId,
+    ButtonState,
+    IllegalStateTransitionError,
+    PicoThreeButtonRaiseLower,
+)
+
+
+class PicoRemoteTest(unittest.TestCase):
+    def test_remote_with_buttons_works_as_a_dict_key(self):
+        remote = PicoThreeButtonRaiseLower(
+            2, "kitchen", MappingProxyType({101: ButtonId.POWER_ON})
+        )
+        same_remote = PicoThreeButtonRaiseLower(
+            2, "kitchen", MappingProxyType({101: ButtonId.POWER_ON})
+        )
+
+        self.assertEqual({remote: "kitchen"}[same_remote], "kitchen")
+
+
+class ButtonEnumTest(unittest.TestCase):
+    def test_button_ids_never_equal_button_actions_or_ints(self):
+        for button_action in ButtonAction:
+            button_id = ButtonId(button_action.value)
+            with self.subTest(button_id=button_id, button_action=button_action):
+                self.assertNotEqual(button_id, button_action)
+                self.assertNotEqual(button_id, button_action.value)
+
+    def test_button_states_step_through_a_double_press(self):
+        button_state = ButtonState.NOT_PRESSED
+        for button_action in (
+            ButtonAction.PRESS,
+            ButtonAction.RELEASE,
+            ButtonAction.PRESS,
+            ButtonAction.RELEASE,
+        ):
+            button_state = button_state.transition(button_action)
+
+        self.assertIs(button_state, ButtonState.DOUBLE_PRESS_FINISHED)
+
+    def test_illegal_transition_names_the_state_and_action(self):
+        with self.assertRaises(IllegalStateTransitionError) as raised:
+            ButtonState.FIRST_PRESS_AND_FIRST_RELEASE.transition(ButtonAction.RELEASE)
+
+        self.assertEqual(
+            str(raised.exception),
+            "current button state is ButtonState.FIRST_PRESS_AND_FIRST_RELEASE, "
+            "but received a button action of ButtonAction.RELEASE",
+        )
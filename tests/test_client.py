@@ -0,0 +1,66 @@
+import json
+import unittest
+from typing import cast
+
+import aiomqtt
+
+from caseta_to_mqtt.z2m.client import Zigbee2mqttClient
+from caseta_to_mqtt.z2m.model import Zigbee2mqttScene
+from caseta_to_mqtt.z2m.state import AllGroups, GroupStateManager
+
+
+class FakeMqttClient:
+    def __init__(self) -> None:
+        self.subscriptions: list = []
+        self.publishes: list[tuple[str, bytes]] = []
+
+    async def subscribe(self, topic, *args, **kwargs) -> None:
+        self.subscriptions.append(topic)
+
+    async def publish(self, topic: str, payload: bytes, *args, **kwargs) -> None:
+        self.publishes.append((topic, payload))
+
+
+def _groups_message(groups: list[dict]) -> aiomqtt.Message:
+    return aiomqtt.Message(
+        "zigbee2mqtt/bridge/groups", json.dumps(groups).encode(), 0, False, 0, None
+    )
+
+
+class Zigbee2mqttClientTest(unittest.IsolatedAsyncioTestCase):
+    async def test_scenes_that_arrive_out_of_order_land_in_their_groups(self):
+        all_groups = AllGroups()
+        # the groups message never touches group state, so there's no manager to fake
+        z2m_client = Zigbee2mqttClient(
+            cast(aiomqtt.Client, FakeMqttClient()),
+            cast(GroupStateManager, None),
+            all_groups,
+        )
+        groups = [
+            {
+                "id": 2,
+                "friendly_name": "office",
+                "scenes": [{"id": 7, "name": "focus"}, {"id": 3, "name": "dim"}],
+            },
+            {
+                "id": 1,
+                "friendly_name": "kitchen",
+                "scenes": [{"id": 5, "name": "cook"}],
+            },
+            {"id": 3, "friendly_name": "hallway", "scenes": []},
+        ]
+
+        await z2m_client._handle_groups_response(_groups_message(groups))
+
+        groups_by_friendly_name = await all_groups.get_groups_by_friendly_name()
+        self.assertEqual(
+            groups_by_friendly_name["office"].scenes,
+            (Zigbee2mqttScene(7, "focus"), Zigbee2mqttScene(3, "dim")),
+        )
+        self.assertEqual(
+            groups_by_friendly_name["kitchen"].scenes, (Zigbee2mqttScene(5, "cook"),)
+        )
+        self.assertEqual(groups_by_friendly_name["hallway"].scenes, ())
+        self.assertEqual(
+            groups_by_friendly_name["office"].scene_index_by_id, {7: 0, 3: 1}
+        )
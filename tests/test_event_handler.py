@@ -0,0 +1,88 @@
+import unittest
+from typing import cast
+
+from dynaconf import Dynaconf
+
+from caseta_to_mqtt.caseta.model import ButtonId, PicoThreeButtonRaiseLower
+from caseta_to_mqtt.event_handler import ButtonEvent, CasetaEvent, EventHandler
+from caseta_to_mqtt.z2m.client import Zigbee2mqttClient
+from caseta_to_mqtt.z2m.model import (
+    GroupState,
+    OnOrOff,
+    Zigbee2mqttGroup,
+    Zigbee2mqttScene,
+)
+from caseta_to_mqtt.z2m.state import AllGroups, GroupStateManager
+
+
+class EventHandlerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.kitchen = Zigbee2mqttGroup(1, "kitchen", ())
+        self.all_groups = AllGroups()
+        await self.all_groups.update_groups({self.kitchen})
+
+    def _event_handler(self, settings: Dynaconf) -> EventHandler:
+        settings.set("zigbee2mqtt_group_scene_cache_ttl_seconds", 60)
+        # room translation never publishes anything, so there's no client to fake
+        return EventHandler(
+            cast(Zigbee2mqttClient, None),
+            self.all_groups,
+            GroupStateManager(settings),
+            settings,
+        )
+
+    async def test_room_mappings_match_remote_names_case_insensitively(self):
+        settings = Dynaconf(environments=False)
+        settings.set("caseta_to_room_mappings", {"Kitchen_Island": "kitchen"})
+        event_handler = self._event_handler(settings)
+
+        for remote_name in ("kitchen_island", "Kitchen_Island", "KITCHEN_ISLAND"):
+            with self.subTest(remote_name=remote_name):
+                self.assertIs(
+                    await event_handler.translate_caseta_room_to_z2m_room(remote_name),
+                    self.kitchen,
+                )
+
+    async def test_remotes_named_after_their_group_need_no_mapping(self):
+        event_handler = self._event_handler(Dynaconf(environments=False))
+
+        self.assertIs(
+            await event_handler.translate_caseta_room_to_z2m_room("kitchen"),
+            self.kitchen,
+        )
+        self.assertIsNone(
+            await event_handler.translate_caseta_room_to_z2m_room("office")
+        )
+
+
+class ButtonEventTest(unittest.IsolatedAsyncioTestCase):
+    async def test_favorite_button_errors_name_the_unexpected_event(self):
+        settings = Dynaconf(environments=False)
+        settings.set("zigbee2mqtt_group_scene_cache_ttl_seconds", 60)
+        group_state_manager = GroupStateManager(settings)
+        kitchen = Zigbee2mqttGroup(1, "kitchen", (Zigbee2mqttScene(1, "cook"),))
+        group_state_manager.set_group_state(
+            "kitchen",
+            GroupState(brightness=None, state=OnOrOff.ON, scene=None, updated_at=0),
+        )
+        event_handler = EventHandler(
+            cast(Zigbee2mqttClient, None), AllGroups(), group_state_manager, settings
+        )
+        remote = PicoThreeButtonRaiseLower(2, "kitchen", {})
+
+        with self.assertRaises(AssertionError) as raised:
+            await event_handler._handle_favorite_button_event(
+                kitchen,
+                CasetaEvent(remote, ButtonId.FAVORITE, ButtonEvent.LONG_PRESS_FINISHED),
+                0,
+            )
+
+        self.assertEqual(
+            str(raised.exception),
+            "expected a double press event, but got ButtonEvent.LONG_PRESS_FINISHED",
+        )
+
+    def test_button_events_never_equal_plain_ints(self):
+        for button_event in ButtonEvent:
+            with self.subTest(button_event=button_event):
+                self.assertNotEqual(button_event, button_event.value)
@@ -0,0 +1,75 @@
+import unittest
+from typing import cast
+
+from caseta_to_mqtt.caseta.button_watcher import ButtonTracker
+from caseta_to_mqtt.caseta.model import ButtonId, PicoThreeButtonRaiseLower
+from caseta_to_mqtt.caseta.topology import Topology
+
+
+class FakeSmartbridge:
+    def __init__(self, devices: dict[str, dict], buttons: dict[str, dict]):
+        self._devices = devices
+        self._buttons = buttons
+
+    async def connect(self) -> None:
+        pass
+
+    def get_devices(self) -> dict[str, dict]:
+        return self._devices
+
+    def get_buttons(self) -> dict[str, dict]:
+        return self._buttons
+
+
+def _remote(device_id: str, name: str) -> dict:
+    return {"device_id": device_id, "name": name, "type": "Pico3ButtonRaiseLower"}
+
+
+def _button(device_id: str, parent_device: str, button_number: int) -> dict:
+    return {
+        "device_id": device_id,
+        "parent_device": parent_device,
+        "button_number": button_number,
+    }
+
+
+class TopologyTest(unittest.IsolatedAsyncioTestCase):
+    async def test_buttons_that_arrive_out_of_order_land_on_their_remotes(self):
+        devices = {
+            "1": {"device_id": "1", "name": "Smart Bridge", "type": "SmartBridge"},
+            "2": _remote("2", "kitchen_Pico"),
+            "3": _remote("3", "office_Pico"),
+        }
+        # interleaved by remote, which a groupby over unsorted buttons would split
+        buttons = {
+            "101": _button("101", "2", 0),
+            "102": _button("102", "3", 0),
+            "103": _button("103", "2", 2),
+            "104": _button("104", "3", 2),
+            "105": _button("105", "2", 1),
+        }
+        # connecting never registers callbacks, so there's no tracker to fake
+        topology = Topology(
+            FakeSmartbridge(devices, buttons), cast(ButtonTracker, None)
+        )
+
+        await topology.connect()
+
+        self.assertEqual(topology.remotes_by_id.keys(), {"2", "3"})
+        kitchen = topology.remotes_by_id["2"]
+        office = topology.remotes_by_id["3"]
+        self.assertIsInstance(kitchen, PicoThreeButtonRaiseLower)
+        self.assertEqual(kitchen.name, "kitchen")
+        self.assertEqual(
+            dict(kitchen.buttons_by_button_id),
+            {
+                "101": ButtonId.POWER_ON,
+                "103": ButtonId.POWER_OFF,
+                "105": ButtonId.FAVORITE,
+            },
+        )
+        self.assertEqual(office.name, "office")
+        self.assertEqual(
+            dict(office.buttons_by_button_id),
+            {"102": ButtonId.POWER_ON, "104": ButtonId.POWER_OFF},
+        )
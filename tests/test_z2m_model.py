@@ -0,0 +1,25 @@
+import unittest
+
+from caseta_to_mqtt.z2m.model import Zigbee2mqttGroup, Zigbee2mqttScene
+
+
+def _kitchen() -> Zigbee2mqttGroup:
+    return Zigbee2mqttGroup(
+        1, "kitchen", (Zigbee2mqttScene(1, "cook"), Zigbee2mqttScene(2, "dinner"))
+    )
+
+
+class Zigbee2mqttGroupTest(unittest.TestCase):
+    def test_group_with_scenes_works_as_a_dict_key(self):
+        groups = {_kitchen(): "kitchen"}
+
+        self.assertEqual(groups[_kitchen()], "kitchen")
+        self.assertEqual(hash(_kitchen()), hash(_kitchen()))
+
+    def test_groups_with_different_scenes_are_different_keys(self):
+        renamed_scene = Zigbee2mqttGroup(
+            1, "kitchen", (Zigbee2mqttScene(1, "cook"), Zigbee2mqttScene(2, "late"))
+        )
+
+        self.assertNotEqual(_kitchen(), renamed_scene)
+        self.assertEqual(len({_kitchen(), renamed_scene}), 2)